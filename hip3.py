@@ -1,15 +1,46 @@
 import requests
+from requests.adapters import HTTPAdapter
+import io
 import json
 import sqlite3
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+DB_PATH = 'hip3_markets.db'
+
+# Shared keep-alive session so concurrent dex fetches reuse pooled HTTPS connections
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=4))
+
+def _connect(path=DB_PATH):
+    """
+    Open a SQLite connection in WAL mode with relaxed fsync.
+    Autocommit is on (isolation_level=None), so callers BEGIN/COMMIT explicitly.
+    """
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA mmap_size=268435456")
+    conn.execute("PRAGMA cache_size=-65536")
+    return conn
+
 def create_database():
     """
     Create SQLite database and table for HIP3 market data
     """
-    conn = sqlite3.connect('hip3_markets.db')
+    conn = _connect()
     cursor = conn.cursor()
-    
+
+    conn.execute("BEGIN")
+
     # Create table with timestamp
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS market_data (
@@ -36,25 +67,26 @@ def create_database():
         ON market_data(dex, timestamp)
     ''')
     
-    conn.commit()
+    conn.execute("COMMIT")
+    
+    # Identical snapshots are skipped by INSERT OR IGNORE in insert_market_data
+    try:
+        cursor.execute('''
+            CREATE UNIQUE INDEX IF NOT EXISTS ux_market_snapshot 
+            ON market_data(dex, market, mark_price, volume_24h, open_interest, funding_rate)
+        ''')
+    except sqlite3.IntegrityError:
+        print("⚠ Existing duplicate snapshots found; duplicate rows will not be skipped")
+    
     conn.close()
     print("✓ Database and table created successfully")
 
-def insert_market_data(markets):
+def _market_rows(markets, timestamp):
     """
-    Insert market data into SQLite database
+    Yield market_data rows lazily so executemany never holds the whole batch
     """
-    conn = sqlite3.connect('hip3_markets.db')
-    cursor = conn.cursor()
-    
-    timestamp = datetime.now()
-    
     for market in markets:
-        cursor.execute('''
-            INSERT INTO market_data 
-            (timestamp, dex, quote_asset, market, mark_price, volume_24h, open_interest, funding_rate)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
+        yield (
             timestamp,
             market['dex'],
             market['quote'],
@@ -63,15 +95,38 @@ def insert_market_data(markets):
             market['dayNtlVlm'],
             market['openInterestUSD'],
             market['funding']
-        ))
+        )
+
+def insert_market_data(markets):
+    """
+    Insert market data into SQLite database
+    """
+    conn = _connect()
+    cursor = conn.cursor()
+    
+    # Same text the sqlite3 datetime adapter would produce, formatted once per
+    # batch instead of once per row
+    timestamp = datetime.now().isoformat(" ")
+    
+    changes_before = conn.total_changes
     
-    conn.commit()
-    rows_inserted = cursor.rowcount
+    # One prepared statement reused for every row inside a single transaction;
+    # rows identical to an existing snapshot are skipped by ux_market_snapshot
+    conn.execute("BEGIN")
+    cursor.executemany('''
+        INSERT OR IGNORE INTO market_data 
+        (timestamp, dex, quote_asset, market, mark_price, volume_24h, open_interest, funding_rate)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', _market_rows(markets, timestamp))
+
+    conn.execute("COMMIT")
+    # Rows actually written, excluding ignored duplicates
+    rows_inserted = conn.total_changes - changes_before
     conn.close()
     
     return rows_inserted
 
-def get_hip3_markets(dex="xyz", quote_currency="USDC"):
+def get_hip3_markets(dex="xyz", quote_currency="USDC", session=SESSION):
     """
     Get market data for a specific HIP3 dex
     """
@@ -87,10 +142,10 @@ def get_hip3_markets(dex="xyz", quote_currency="USDC"):
     }
     
     try:
-        response = requests.post(url, headers=headers, json=payload)
+        response = session.post(url, headers=headers, json=payload)
         response.raise_for_status()
         
-        data = response.json()
+        data = _json_loads(response.content)
         
         metadata = data[0]
         asset_contexts = data[1]
@@ -99,37 +154,34 @@ def get_hip3_markets(dex="xyz", quote_currency="USDC"):
         
         active_markets = []
         
-        for i, market in enumerate(universe):
-            coin_name = market.get("name", "N/A")
-            market_data = asset_contexts[i]
-            
-            mark_px = market_data.get('markPx', '0')
-            day_volume = market_data.get('dayNtlVlm', '0')
-            open_interest_contracts = market_data.get('openInterest', '0')
-            funding = market_data.get('funding', '0')
+        for market, market_data in zip(universe, asset_contexts):
+            # Missing/empty fields are normalized to '0' so float() needs no per-field branch
+            day_volume = market_data.get('dayNtlVlm') or '0'
             
             try:
-                mark_px_float = float(mark_px) if mark_px else 0
-                oi_contracts_float = float(open_interest_contracts) if open_interest_contracts else 0
-                day_volume_float = float(day_volume) if day_volume else 0
-                funding_float = float(funding) if funding else 0
+                day_volume_float = float(day_volume)
                 
-                oi_usd = oi_contracts_float * mark_px_float
+                # Only include if volume > 0; inactive markets skip the remaining parsing
+                if day_volume_float <= 0:
+                    continue
                 
-                # Only include if volume > 0
-                if day_volume_float > 0:
-                    active_markets.append({
-                        "dex": dex,
-                        "quote": quote_currency,
-                        "market": coin_name,
-                        "markPx": mark_px_float,
-                        "dayNtlVlm": day_volume_float,
-                        "openInterestUSD": oi_usd,
-                        "funding": funding_float
-                    })
-                    
+                mark_px_float, oi_contracts_float, funding_float = map(float, (
+                    market_data.get('markPx') or '0',
+                    market_data.get('openInterest') or '0',
+                    market_data.get('funding') or '0'
+                ))
             except (ValueError, TypeError):
-                pass
+                continue
+            
+            active_markets.append({
+                "dex": dex,
+                "quote": quote_currency,
+                "market": market.get("name", "N/A"),
+                "markPx": mark_px_float,
+                "dayNtlVlm": day_volume_float,
+                "openInterestUSD": oi_contracts_float * mark_px_float,
+                "funding": funding_float
+            })
         
         return active_markets
         
@@ -150,43 +202,51 @@ def get_all_hip3_markets_combined():
         {"name": "vntl", "quote": "USDH"}
     ]
     
-    all_markets = []
-    
     for config in dex_configs:
-        dex_name = config["name"]
-        quote = config["quote"]
-        print(f"\nFetching {dex_name} markets (quoted in {quote})...")
-        markets = get_hip3_markets(dex_name, quote)
-        all_markets.extend(markets)
-        print(f"✓ Found {len(markets)} active markets in {dex_name}")
+        print(f"\nFetching {config['name']} markets (quoted in {config['quote']})...")
+    
+    # Fetch all dexes concurrently; results come back in dex_configs order
+    with ThreadPoolExecutor(max_workers=len(dex_configs)) as executor:
+        results = list(executor.map(lambda c: get_hip3_markets(c["name"], c["quote"]), dex_configs))
+    
+    for config, markets in zip(dex_configs, results):
+        print(f"✓ Found {len(markets)} active markets in {config['name']}")
+    
+    all_markets = [m for markets in results for m in markets]
     
     # Sort by volume descending
     all_markets.sort(key=lambda x: -x['dayNtlVlm'])
     
+    # Build the whole report in memory and write it to stdout once
+    report = io.StringIO()
+    
     # Display all markets
-    print(f"\n{'='*120}")
-    print(f"All HIP3 Perpetual Markets (Sorted by 24h Volume)")
-    print(f"{'='*120}")
-    print(f"{'Rank':<6} {'Dex':<8} {'Quote':<8} {'Market':<20} {'Mark Price':<15} {'24h Volume':<20} {'Open Interest $':<20} {'Funding Rate':<15}")
-    print(f"{'='*120}")
+    print(f"\n{'='*120}", file=report)
+    print(f"All HIP3 Perpetual Markets (Sorted by 24h Volume)", file=report)
+    print(f"{'='*120}", file=report)
+    print(f"{'Rank':<6} {'Dex':<8} {'Quote':<8} {'Market':<20} {'Mark Price':<15} {'24h Volume':<20} {'Open Interest $':<20} {'Funding Rate':<15}", file=report)
+    print(f"{'='*120}", file=report)
     
-    for rank, market in enumerate(all_markets, 1):
-        print(f"{rank:<6} {market['dex']:<8} {market['quote']:<8} {market['market']:<20} ${market['markPx']:<14.2f} ${market['dayNtlVlm']:<19,.0f} ${market['openInterestUSD']:<19,.0f} {market['funding']:<15.6f}")
+    if all_markets:
+        print("\n".join(
+            f"{rank:<6} {market['dex']:<8} {market['quote']:<8} {market['market']:<20} ${market['markPx']:<14.2f} ${market['dayNtlVlm']:<19,.0f} ${market['openInterestUSD']:<19,.0f} {market['funding']:<15.6f}"
+            for rank, market in enumerate(all_markets, 1)
+        ), file=report)
     
-    print(f"{'='*120}")
+    print(f"{'='*120}", file=report)
     # Overall totals
     total_volume = sum(m['dayNtlVlm'] for m in all_markets)
     total_oi = sum(m['openInterestUSD'] for m in all_markets)
     
-    print(f"{'='*80}")
-    print(f"Overall Totals:")
-    print(f"  Total Active Markets: {len(all_markets)}")
-    print(f"  Total 24h Volume: ${total_volume:,.2f}")
-    print(f"  Total Open Interest: ${total_oi:,.2f}")
+    print(f"{'='*80}", file=report)
+    print(f"Overall Totals:", file=report)
+    print(f"  Total Active Markets: {len(all_markets)}", file=report)
+    print(f"  Total 24h Volume: ${total_volume:,.2f}", file=report)
+    print(f"  Total Open Interest: ${total_oi:,.2f}", file=report)
 
     # Summary by dex
-    print(f"\nSummary by Dex:")
-    print(f"{'='*80}")
+    print(f"\nSummary by Dex:", file=report)
+    print(f"{'='*80}", file=report)
     
     for config in dex_configs:
         dex_name = config["name"]
@@ -195,13 +255,13 @@ def get_all_hip3_markets_combined():
         total_volume = sum(m['dayNtlVlm'] for m in dex_markets)
         total_oi = sum(m['openInterestUSD'] for m in dex_markets)
         
-        print(f"{dex_name} (quoted in {quote}):")
-        print(f"  Active Markets: {len(dex_markets)}")
-        print(f"  Total 24h Volume: ${total_volume:,.2f}")
-        print(f"  Total Open Interest: ${total_oi:,.2f}")
-        print()
+        print(f"{dex_name} (quoted in {quote}):", file=report)
+        print(f"  Active Markets: {len(dex_markets)}", file=report)
+        print(f"  Total 24h Volume: ${total_volume:,.2f}", file=report)
+        print(f"  Total Open Interest: ${total_oi:,.2f}", file=report)
+        print(file=report)
     
-
+    sys.stdout.write(report.getvalue())
     
     return all_markets
 
@@ -209,7 +269,7 @@ def view_latest_data(limit=10):
     """
     View the latest data from the database
     """
-    conn = sqlite3.connect('hip3_markets.db')
+    conn = _connect()
     cursor = conn.cursor()
     
     cursor.execute('''
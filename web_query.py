@@ -4,53 +4,270 @@ Vault Database Web Interface
 Flask web app for querying and analyzing vault data
 """
 
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, g, render_template, request, jsonify
+import atexit
+from bisect import bisect_right
 import sqlite3
+import threading
+import time
 from datetime import datetime
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 app = Flask(__name__)
 DB_PATH = 'vaults.db'
+_schema_ready = False
 
+# Idle connections shared across requests; the dev server starts a thread per
+# request, so connections are pooled by process rather than by thread
+DB_POOL_MAXSIZE = 4
+_db_pool = []
+_db_pool_lock = threading.Lock()
 
-def get_db_connection():
-    """Get database connection"""
-    conn = sqlite3.connect(DB_PATH)
+# Dropdown lists (platforms, vault types, tokens, vault names) change rarely
+# but are requested on every page load and filter change
+LOOKUP_CACHE_TTL = 60
+LOOKUP_CACHE_MAXSIZE = 64
+_lookup_cache = {}
+_lookup_cache_lock = threading.Lock()
+
+
+VAULT_SNAPSHOT_INDEXES = {
+    # Lets the ROW_NUMBER() partition walk the index newest-first without sorting
+    'idx_vault_pk_ts': "CREATE INDEX IF NOT EXISTS idx_vault_pk_ts ON vault_snapshots(platform, vault_name, id DESC)",
+    'idx_vs_ts': "CREATE INDEX IF NOT EXISTS idx_vs_ts ON vault_snapshots(timestamp)",
+    'idx_vs_type': "CREATE INDEX IF NOT EXISTS idx_vs_type ON vault_snapshots(vault_type)",
+    'idx_vs_token': "CREATE INDEX IF NOT EXISTS idx_vs_token ON vault_snapshots(deposit_token)",
+}
+
+
+def ensure_indexes(conn):
+    """Create indexes used by the endpoint queries"""
+    existing = {row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'vault_snapshots'"
+    ).fetchall()}
+    missing = [name for name in VAULT_SNAPSHOT_INDEXES if name not in existing]
+    
+    for name in missing:
+        conn.execute(VAULT_SNAPSHOT_INDEXES[name])
+    
+    # Refresh planner statistics so the new indexes get picked up
+    if missing:
+        conn.execute("ANALYZE vault_snapshots")
+
+
+# Trigger statement removing OLD's catalog entry when no snapshot still carries it
+VAULTS_CATALOG_PRUNE_OLD = """
+                DELETE FROM vaults_catalog
+                WHERE platform = OLD.platform
+                AND vault_name = OLD.vault_name
+                AND vault_type = IFNULL(OLD.vault_type, '')
+                AND NOT EXISTS (
+                    SELECT 1 FROM vault_snapshots
+                    WHERE platform = OLD.platform
+                    AND vault_name = OLD.vault_name
+                    AND IFNULL(vault_type, '') = IFNULL(OLD.vault_type, '')
+                );"""
+
+
+def ensure_vaults_catalog(conn):
+    """Create vaults_catalog (vaults read by the dropdowns) and the triggers syncing it with vault_snapshots"""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'vaults_catalog'"
+        ).fetchone()
+        
+        if not exists:
+            conn.execute("""
+                CREATE TABLE vaults_catalog (
+                    platform TEXT,
+                    vault_name TEXT,
+                    vault_type TEXT NOT NULL DEFAULT '',
+                    PRIMARY KEY (platform, vault_name, vault_type)
+                )
+            """)
+            conn.execute("""
+                INSERT OR IGNORE INTO vaults_catalog (platform, vault_name, vault_type)
+                SELECT DISTINCT platform, vault_name, IFNULL(vault_type, '')
+                FROM vault_snapshots
+            """)
+        
+        # NULL vault types are stored as '' so the primary key still deduplicates them
+        conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_vaults_catalog
+            AFTER INSERT ON vault_snapshots
+            BEGIN
+                INSERT OR IGNORE INTO vaults_catalog (platform, vault_name, vault_type)
+                VALUES (NEW.platform, NEW.vault_name, IFNULL(NEW.vault_type, ''));
+            END
+        """)
+        
+        # Drop a catalog entry once its last snapshot is deleted or moved away
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_vaults_catalog_delete
+            AFTER DELETE ON vault_snapshots
+            BEGIN
+                {VAULTS_CATALOG_PRUNE_OLD}
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_vaults_catalog_update
+            AFTER UPDATE OF platform, vault_name, vault_type ON vault_snapshots
+            BEGIN
+                INSERT OR IGNORE INTO vaults_catalog (platform, vault_name, vault_type)
+                VALUES (NEW.platform, NEW.vault_name, IFNULL(NEW.vault_type, ''));
+                {VAULTS_CATALOG_PRUNE_OLD}
+            END
+        """)
+        
+        # Remove entries orphaned while the delete/update triggers didn't exist yet
+        conn.execute("""
+            DELETE FROM vaults_catalog
+            WHERE NOT EXISTS (
+                SELECT 1 FROM vault_snapshots vs
+                WHERE vs.platform = vaults_catalog.platform
+                AND vs.vault_name = vaults_catalog.vault_name
+                AND IFNULL(vs.vault_type, '') = vaults_catalog.vault_type
+            )
+        """)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def ensure_schema(conn):
+    """Create indexes and the vaults catalog (once per process)"""
+    global _schema_ready
+    if _schema_ready:
+        return
+    
+    ensure_indexes(conn)
+    ensure_vaults_catalog(conn)
+    _schema_ready = True
+
+
+def open_db_connection():
+    """Open a database connection (WAL mode, autocommit; BEGIN/COMMIT explicitly when writing)"""
+    conn = sqlite3.connect(DB_PATH, isolation_level=None, cached_statements=256, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA mmap_size=268435456")
+    conn.execute("PRAGMA cache_size=-65536")
     conn.row_factory = sqlite3.Row
+    ensure_schema(conn)
     return conn
 
 
+def get_db_connection():
+    """Get the current request's database connection, taken from the pool when one is idle"""
+    if 'db' not in g:
+        with _db_pool_lock:
+            conn = _db_pool.pop() if _db_pool else None
+        g.db = conn if conn is not None else open_db_connection()
+    return g.db
+
+
+@app.teardown_appcontext
+def release_db_connection(exception):
+    """Return the request's connection to the pool, closing it if the pool is full"""
+    conn = g.pop('db', None)
+    if conn is None:
+        return
+    
+    if conn.in_transaction:
+        conn.execute("ROLLBACK")
+    
+    with _db_pool_lock:
+        if len(_db_pool) < DB_POOL_MAXSIZE:
+            _db_pool.append(conn)
+            return
+    conn.close()
+
+
+@atexit.register
+def close_db_connections():
+    """Close all idle pooled connections on interpreter exit"""
+    with _db_pool_lock:
+        while _db_pool:
+            _db_pool.pop().close()
+
+
+def json_response(payload):
+    """Serialize payload with orjson when available, falling back to jsonify"""
+    if orjson is None:
+        return jsonify(payload)
+    
+    # OPT_NON_STR_KEYS keeps a NULL vault_type usable as a by_type key, as with json
+    return app.response_class(orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS), mimetype='application/json')
+
+
+def lookup_cache_get(key):
+    """Return the cached value for key, or None if missing or older than LOOKUP_CACHE_TTL"""
+    with _lookup_cache_lock:
+        entry = _lookup_cache.get(key)
+    
+    if entry is not None and time.monotonic() - entry[0] < LOOKUP_CACHE_TTL:
+        app.logger.debug("Lookup cache hit: %s", key)
+        return entry[1]
+    
+    app.logger.debug("Lookup cache miss: %s", key)
+    return None
+
+
+def lookup_cache_set(key, value):
+    """Store value under key, evicting the oldest entry when the cache is full"""
+    with _lookup_cache_lock:
+        _lookup_cache.pop(key, None)
+        if len(_lookup_cache) >= LOOKUP_CACHE_MAXSIZE:
+            del _lookup_cache[next(iter(_lookup_cache))]
+        _lookup_cache[key] = (time.monotonic(), value)
+
+
+# Suffix buckets for format_money: thresholds split amounts into
+# [<1K, K, M, B], each with its own divisor and pre-bound format
+_MONEY_THRESHOLDS = (1_000, 1_000_000, 1_000_000_000)
+_MONEY_DIVISORS = (1, 1_000, 1_000_000, 1_000_000_000)
+_MONEY_FORMATS = ("${:.2f}".format, "${:.2f}K".format, "${:.2f}M".format, "${:.2f}B".format)
+_APY_FORMAT = "{:.2f}%".format
+
+
 def format_money(amount):
     """Format money with K/M/B suffix"""
     if amount is None:
         return "N/A"
     
-    if amount >= 1_000_000_000:
-        return f"${amount/1_000_000_000:.2f}B"
-    elif amount >= 1_000_000:
-        return f"${amount/1_000_000:.2f}M"
-    elif amount >= 1_000:
-        return f"${amount/1_000:.2f}K"
-    else:
-        return f"${amount:.2f}"
+    bucket = bisect_right(_MONEY_THRESHOLDS, amount)
+    return _MONEY_FORMATS[bucket](amount / _MONEY_DIVISORS[bucket])
 
 
 def format_apy(apy):
     """Format APY percentage"""
     if apy is None:
         return "N/A"
-    return f"{apy:.2f}%"
+    return _APY_FORMAT(apy)
 
 
 @app.route('/')
 def index():
     """Main page with query interface"""
+    cached = lookup_cache_get(('index',))
+    if cached is not None:
+        platforms, vault_types = cached
+        return render_template('index.html', platforms=platforms, vault_types=vault_types)
+    
     conn = get_db_connection()
     
     # Get available platforms and vault types
-    platforms = [row[0] for row in conn.execute("SELECT DISTINCT platform FROM vault_snapshots ORDER BY platform").fetchall()]
-    vault_types = [row[0] for row in conn.execute("SELECT DISTINCT vault_type FROM vault_snapshots ORDER BY vault_type").fetchall()]
+    platforms = [row[0] for row in conn.execute("SELECT DISTINCT platform FROM vaults_catalog ORDER BY platform").fetchall()]
+    vault_types = [row[0] for row in conn.execute("SELECT DISTINCT NULLIF(vault_type, '') AS vault_type FROM vaults_catalog ORDER BY vault_type").fetchall()]
     
-    conn.close()
+    lookup_cache_set(('index',), (platforms, vault_types))
     
     return render_template('index.html', platforms=platforms, vault_types=vault_types)
 
@@ -63,11 +280,28 @@ def get_available_vaults():
     platforms = data.get('platforms', [])
     vault_type = data.get('vault_type')
     
+    # Key on exactly the filter values the query binds; input that can't be
+    # sorted or hashed bypasses the cache and gets the uncached behaviour
+    try:
+        cache_key = (
+            'available_vaults',
+            tuple(sorted(platforms, key=repr)) if platforms else (),
+            vault_type if vault_type and vault_type != '' else None
+        )
+        hash(cache_key)
+    except TypeError:
+        cache_key = None
+    
+    if cache_key is not None:
+        cached = lookup_cache_get(cache_key)
+        if cached is not None:
+            return json_response(cached)
+    
     conn = get_db_connection()
     
     query = """
         SELECT DISTINCT platform, vault_name
-        FROM vault_snapshots
+        FROM vaults_catalog
         WHERE 1=1
     """
     
@@ -97,9 +331,11 @@ def get_available_vaults():
             'display_name': f"{row['platform']} - {row['vault_name']}"
         })
     
-    conn.close()
+    payload = {'vaults': vaults}
+    if cache_key is not None:
+        lookup_cache_set(cache_key, payload)
     
-    return jsonify({'vaults': vaults})
+    return json_response(payload)
 
 
 @app.route('/api/cumulative_deposits', methods=['POST'])
@@ -146,18 +382,18 @@ def get_cumulative_deposits():
     
     cursor = conn.cursor()
     cursor.execute(query, params)
-    results = cursor.fetchall()
     
-    # Format results
+    # Format results straight off the cursor instead of materializing fetchall()
     history = []
     deposit_values = []
-    for row in results:
+    for row in cursor:
+        total_deposits = row['total_deposits']
         history.append({
             'timestamp': row['timestamp'],
-            'total_deposits': row['total_deposits']
+            'total_deposits': total_deposits
         })
-        if row['total_deposits'] is not None:
-            deposit_values.append(row['total_deposits'])
+        if total_deposits is not None:
+            deposit_values.append(total_deposits)
     
     # Calculate statistics
     avg_deposits = sum(deposit_values) / len(deposit_values) if deposit_values else 0
@@ -165,9 +401,7 @@ def get_cumulative_deposits():
     max_deposits = max(deposit_values) if deposit_values else 0
     current_deposits = deposit_values[-1] if deposit_values else 0
     
-    conn.close()
-    
-    return jsonify({
+    return json_response({
         'history': history,
         'avg_deposits': avg_deposits,
         'min_deposits': min_deposits,
@@ -179,6 +413,10 @@ def get_cumulative_deposits():
 @app.route('/api/available_tokens', methods=['GET'])
 def get_available_tokens():
     """API endpoint for getting list of all unique deposit tokens"""
+    cached = lookup_cache_get(('available_tokens',))
+    if cached is not None:
+        return json_response(cached)
+    
     conn = get_db_connection()
     
     query = """
@@ -194,9 +432,10 @@ def get_available_tokens():
     
     tokens = [row['deposit_token'] for row in results]
     
-    conn.close()
+    payload = {'tokens': tokens}
+    lookup_cache_set(('available_tokens',), payload)
     
-    return jsonify({'tokens': tokens})
+    return json_response(payload)
 
 
 @app.route('/api/vault_history', methods=['POST'])
@@ -209,7 +448,7 @@ def get_vault_history():
     days_back = data.get('days_back', 30)  # Default to 30 days
     
     if not platform or not vault_name:
-        return jsonify({'error': 'Platform and vault_name required'}), 400
+        return json_response({'error': 'Platform and vault_name required'}), 400
     
     conn = get_db_connection()
     
@@ -250,9 +489,7 @@ def get_vault_history():
     # Calculate average APY
     avg_apy = sum(valid_apys) / len(valid_apys) if valid_apys else 0
     
-    conn.close()
-    
-    return jsonify({
+    return json_response({
         'platform': platform,
         'vault_name': vault_name,
         'history': history,
@@ -278,10 +515,12 @@ def query_vaults():
     
     # Build subquery for date filtering
     date_condition = ""
+    date_params = []
     if days_back and days_back != '':
-        date_condition = f"AND datetime(timestamp) >= datetime('now', '-{int(days_back)} days')"
+        date_condition = "AND datetime(timestamp) >= datetime('now', '-' || ? || ' days')"
+        date_params = [int(days_back)]
     
-    # Build query to get both latest APY and average APY
+    # Single pass: latest snapshot and period-average APY per vault via window functions
     query = f"""
         WITH latest_snapshots AS (
             SELECT 
@@ -292,23 +531,17 @@ def query_vaults():
                 deposit_amount,
                 deposit_token,
                 apy_percentage as latest_apy,
+                average_apy,
                 timestamp
-            FROM vault_snapshots
-            WHERE id IN (
-                SELECT MAX(id)
+            FROM (
+                SELECT 
+                    *,
+                    ROW_NUMBER() OVER (PARTITION BY platform, vault_name ORDER BY id DESC) as rn,
+                    AVG(apy_percentage) OVER (PARTITION BY platform, vault_name) as average_apy
                 FROM vault_snapshots
                 WHERE 1=1 {date_condition}
-                GROUP BY platform, vault_name
             )
-        ),
-        avg_apy AS (
-            SELECT 
-                platform,
-                vault_name,
-                AVG(apy_percentage) as average_apy
-            FROM vault_snapshots
-            WHERE 1=1 {date_condition}
-            GROUP BY platform, vault_name
+            WHERE rn = 1
         )
         SELECT 
             ls.platform,
@@ -318,15 +551,14 @@ def query_vaults():
             ls.deposit_amount,
             ls.deposit_token,
             ls.latest_apy,
-            aa.average_apy,
+            ls.average_apy,
             ls.timestamp
         FROM latest_snapshots ls
-        LEFT JOIN avg_apy aa ON ls.platform = aa.platform AND ls.vault_name = aa.vault_name
         WHERE 1=1
     """
     
     conditions = []
-    params = []
+    params = list(date_params)
     
     if platforms:
         placeholders = ','.join('?' * len(platforms))
@@ -356,7 +588,7 @@ def query_vaults():
     if sort_by == 'apy':
         query += f" ORDER BY ls.latest_apy {sort_order.upper()}"
     elif sort_by == 'avg_apy':
-        query += f" ORDER BY aa.average_apy {sort_order.upper()}"
+        query += f" ORDER BY ls.average_apy {sort_order.upper()}"
     elif sort_by == 'deposits':
         query += f" ORDER BY ls.deposit_amount {sort_order.upper()}"
     else:
@@ -384,9 +616,7 @@ def query_vaults():
             'timestamp': row['timestamp']
         })
     
-    conn.close()
-    
-    return jsonify({
+    return json_response({
         'vaults': vaults,
         'count': len(vaults)
     })
@@ -406,48 +636,13 @@ def get_stats():
     
     # Build subquery for date filtering
     date_condition = ""
+    date_params = []
     if days_back and days_back != '':
-        date_condition = f"AND datetime(timestamp) >= datetime('now', '-{int(days_back)} days')"
-    
-    # Build query for latest snapshots with average APY
-    query = f"""
-        WITH latest_snapshots AS (
-            SELECT 
-                platform,
-                vault_name,
-                vault_type,
-                deposit_amount,
-                apy_percentage as latest_apy
-            FROM vault_snapshots
-            WHERE id IN (
-                SELECT MAX(id)
-                FROM vault_snapshots
-                WHERE 1=1 {date_condition}
-                GROUP BY platform, vault_name
-            )
-        ),
-        avg_apy AS (
-            SELECT 
-                platform,
-                vault_name,
-                AVG(apy_percentage) as average_apy
-            FROM vault_snapshots
-            WHERE 1=1 {date_condition}
-            GROUP BY platform, vault_name
-        )
-        SELECT 
-            ls.platform,
-            ls.vault_type,
-            ls.deposit_amount,
-            ls.latest_apy,
-            aa.average_apy
-        FROM latest_snapshots ls
-        LEFT JOIN avg_apy aa ON ls.platform = aa.platform AND ls.vault_name = aa.vault_name
-        WHERE 1=1
-    """
+        date_condition = "AND datetime(timestamp) >= datetime('now', '-' || ? || ' days')"
+        date_params = [int(days_back)]
     
     conditions = []
-    params = []
+    params = list(date_params)
     
     if platforms:
         placeholders = ','.join('?' * len(platforms))
@@ -462,69 +657,122 @@ def get_stats():
         conditions.append("ls.deposit_amount >= ?")
         params.append(float(min_deposits))
     
+    filter_condition = ""
     if conditions:
-        query += " AND " + " AND ".join(conditions)
+        filter_condition = "AND " + " AND ".join(conditions)
+    
+    # Overall, per-platform and per-type rollups in one statement. SQLite has no
+    # GROUPING SETS, so the three groupings are UNIONed over the shared CTE.
+    # Breakdown averages skip zero APYs (NULLIF), as they always have.
+    query = f"""
+        WITH latest_snapshots AS (
+            SELECT 
+                platform,
+                vault_name,
+                vault_type,
+                deposit_amount,
+                apy_percentage as latest_apy,
+                average_apy
+            FROM (
+                SELECT 
+                    *,
+                    ROW_NUMBER() OVER (PARTITION BY platform, vault_name ORDER BY id DESC) as rn,
+                    AVG(apy_percentage) OVER (PARTITION BY platform, vault_name) as average_apy
+                FROM vault_snapshots
+                WHERE 1=1 {date_condition}
+            )
+            WHERE rn = 1
+        ),
+        filtered AS (
+            SELECT ls.*
+            FROM latest_snapshots ls
+            WHERE 1=1 {filter_condition}
+        )
+        SELECT 
+            'overall' as grouping,
+            NULL as group_key,
+            COUNT(*) as count,
+            AVG(latest_apy) as avg_latest_apy,
+            AVG(average_apy) as avg_period_apy,
+            MAX(latest_apy) as max_apy,
+            MIN(latest_apy) as min_apy,
+            SUM(deposit_amount) as total_tvl,
+            AVG(deposit_amount) as avg_tvl
+        FROM filtered
+        UNION ALL
+        SELECT 
+            'platform',
+            platform,
+            COUNT(*),
+            AVG(NULLIF(latest_apy, 0)),
+            AVG(NULLIF(average_apy, 0)),
+            NULL,
+            NULL,
+            SUM(deposit_amount),
+            NULL
+        FROM filtered
+        GROUP BY platform
+        UNION ALL
+        SELECT 
+            'type',
+            vault_type,
+            COUNT(*),
+            AVG(NULLIF(latest_apy, 0)),
+            AVG(NULLIF(average_apy, 0)),
+            NULL,
+            NULL,
+            SUM(deposit_amount),
+            NULL
+        FROM filtered
+        GROUP BY vault_type
+    """
     
     cursor = conn.cursor()
     cursor.execute(query, params)
     results = cursor.fetchall()
     
-    # Calculate statistics
-    valid_latest_apys = [row['latest_apy'] for row in results if row['latest_apy'] is not None]
-    valid_avg_apys = [row['average_apy'] for row in results if row['average_apy'] is not None]
-    valid_deposits = [row['deposit_amount'] for row in results if row['deposit_amount'] is not None]
-    
-    stats = {
-        'total_vaults': len(results),
-        'avg_latest_apy': sum(valid_latest_apys) / len(valid_latest_apys) if valid_latest_apys else 0,
-        'avg_period_apy': sum(valid_avg_apys) / len(valid_avg_apys) if valid_avg_apys else 0,
-        'max_apy': max(valid_latest_apys) if valid_latest_apys else 0,
-        'min_apy': min(valid_latest_apys) if valid_latest_apys else 0,
-        'total_tvl': sum(valid_deposits) if valid_deposits else 0,
-        'avg_tvl': sum(valid_deposits) / len(valid_deposits) if valid_deposits else 0,
-        'total_tvl_formatted': format_money(sum(valid_deposits) if valid_deposits else 0),
-        'avg_tvl_formatted': format_money(sum(valid_deposits) / len(valid_deposits) if valid_deposits else 0),
-        'avg_latest_apy_formatted': format_apy(sum(valid_latest_apys) / len(valid_latest_apys) if valid_latest_apys else 0),
-        'avg_period_apy_formatted': format_apy(sum(valid_avg_apys) / len(valid_avg_apys) if valid_avg_apys else 0),
-        'max_apy_formatted': format_apy(max(valid_latest_apys) if valid_latest_apys else 0),
-        'min_apy_formatted': format_apy(min(valid_latest_apys) if valid_latest_apys else 0),
-    }
-    
-    # Get breakdown by platform
+    stats = {}
     platform_stats = {}
-    for platform in set(row['platform'] for row in results):
-        platform_results = [r for r in results if r['platform'] == platform]
-        platform_latest_apys = [r['latest_apy'] for r in platform_results if r['latest_apy']]
-        platform_avg_apys = [r['average_apy'] for r in platform_results if r['average_apy']]
-        platform_deposits = [r['deposit_amount'] for r in platform_results if r['deposit_amount']]
-        
-        platform_stats[platform] = {
-            'count': len(platform_results),
-            'avg_latest_apy': sum(platform_latest_apys) / len(platform_latest_apys) if platform_latest_apys else 0,
-            'avg_period_apy': sum(platform_avg_apys) / len(platform_avg_apys) if platform_avg_apys else 0,
-            'total_tvl': sum(platform_deposits) if platform_deposits else 0,
-            'total_tvl_formatted': format_money(sum(platform_deposits) if platform_deposits else 0),
-        }
-    
-    # Get breakdown by type
     type_stats = {}
-    for vault_type_stat in set(row['vault_type'] for row in results):
-        type_results = [r for r in results if r['vault_type'] == vault_type_stat]
-        type_latest_apys = [r['latest_apy'] for r in type_results if r['latest_apy']]
-        type_avg_apys = [r['average_apy'] for r in type_results if r['average_apy']]
-        type_deposits = [r['deposit_amount'] for r in type_results if r['deposit_amount']]
+    for row in results:
+        avg_latest_apy = row['avg_latest_apy'] if row['avg_latest_apy'] is not None else 0
+        avg_period_apy = row['avg_period_apy'] if row['avg_period_apy'] is not None else 0
+        total_tvl = row['total_tvl'] if row['total_tvl'] is not None else 0
         
-        type_stats[vault_type_stat] = {
-            'count': len(type_results),
-            'avg_latest_apy': sum(type_latest_apys) / len(type_latest_apys) if type_latest_apys else 0,
-            'avg_period_apy': sum(type_avg_apys) / len(type_avg_apys) if type_avg_apys else 0,
-            'total_tvl': sum(type_deposits) if type_deposits else 0,
-            'total_tvl_formatted': format_money(sum(type_deposits) if type_deposits else 0),
+        if row['grouping'] == 'overall':
+            avg_tvl = row['avg_tvl'] if row['avg_tvl'] is not None else 0
+            max_apy = row['max_apy'] if row['max_apy'] is not None else 0
+            min_apy = row['min_apy'] if row['min_apy'] is not None else 0
+            stats = {
+                'total_vaults': row['count'],
+                'avg_latest_apy': avg_latest_apy,
+                'avg_period_apy': avg_period_apy,
+                'max_apy': max_apy,
+                'min_apy': min_apy,
+                'total_tvl': total_tvl,
+                'avg_tvl': avg_tvl,
+                'total_tvl_formatted': format_money(total_tvl),
+                'avg_tvl_formatted': format_money(avg_tvl),
+                'avg_latest_apy_formatted': format_apy(avg_latest_apy),
+                'avg_period_apy_formatted': format_apy(avg_period_apy),
+                'max_apy_formatted': format_apy(max_apy),
+                'min_apy_formatted': format_apy(min_apy),
+            }
+            continue
+        
+        group_stats = {
+            'count': row['count'],
+            'avg_latest_apy': avg_latest_apy,
+            'avg_period_apy': avg_period_apy,
+            'total_tvl': total_tvl,
+            'total_tvl_formatted': format_money(total_tvl),
         }
+        if row['grouping'] == 'platform':
+            platform_stats[row['group_key']] = group_stats
+        else:
+            type_stats[row['group_key']] = group_stats
     
-    conn.close()
-    
-    return jsonify({
+    return json_response({
         'overall': stats,
         'by_platform': platform_stats,
         'by_type': type_stats